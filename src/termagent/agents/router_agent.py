@@ -1,3 +1,4 @@
+import json
 import re
 import subprocess
 import shlex
@@ -5,7 +6,7 @@ import os
 from typing import Dict, Any, List, Tuple, Optional
 from langchain_core.messages import HumanMessage, AIMessage
 from termagent.agents.base_agent import BaseAgent
-from termagent.shell_commands import ShellCommandHandler
+from termagent.shell_commands import get_handler
 from termagent.directory_context import get_directory_context, get_relevant_files_context
 
 class RouterAgent(BaseAgent):
@@ -14,7 +15,7 @@ class RouterAgent(BaseAgent):
     def __init__(self, debug: bool = False, no_confirm: bool = False, llm_model: str = "gpt-3.5-turbo"):
         super().__init__("router_agent", debug, no_confirm)
         
-        self.shell_detector = ShellCommandHandler(debug=debug, no_confirm=no_confirm)
+        self.shell_detector = get_handler(debug=debug, no_confirm=no_confirm)
         
         self._initialize_llm(llm_model)
     
@@ -159,7 +160,6 @@ Breakdown: [
             content = response.content.strip()
             
             # Try to extract JSON from the response
-            import json
             # Look for JSON content between ```json and ``` markers
             json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
             if json_match:
@@ -200,19 +200,19 @@ Breakdown: [
         messages = state.get("messages", [])
         
         # Create breakdown message
-        breakdown_text = f"📋 Task Breakdown for: {task}\n\n"
+        breakdown_parts = [f"📋 Task Breakdown for: {task}\n\n"]
         
         # Add summary of what will be accomplished
         if len(breakdown) == 1:
-            breakdown_text += f"🎯 This task will be completed in 1 step:\n\n"
+            breakdown_parts.append("🎯 This task will be completed in 1 step:\n\n")
         else:
-            breakdown_text += f"🎯 This task will be completed in {len(breakdown)} steps:\n\n"
+            breakdown_parts.append(f"🎯 This task will be completed in {len(breakdown)} steps:\n\n")
         
         for step_info in breakdown:
-            breakdown_text += f"[{step_info['step']}] -- {step_info['description']}\n"
-            breakdown_text += f"  Command: {step_info['command']}\n\n"
+            breakdown_parts.append(f"[{step_info['step']}] -- {step_info['description']}\n")
+            breakdown_parts.append(f"  Command: {step_info['command']}\n\n")
         
-        messages.append(AIMessage(content=breakdown_text))
+        messages.append(AIMessage(content="".join(breakdown_parts)))
         
         # Debug output: Print task steps
         if self.debug:
@@ -4,67 +4,224 @@ Shell command detector and executor for TermAgent.
 Handles direct execution of known shell commands.
 """
 
+import functools
 import os
+import stat
 import subprocess
+import threading
+import time
 import shlex
+import shutil
 import re
-from typing import Tuple, Optional, Dict
+from collections import deque
+from typing import Tuple, Optional, Dict, Iterable, List
+
+
+# Alias definition: optional 'alias' keyword, name, then a value with matching surrounding quotes stripped
+_ALIAS_RE = re.compile(r"""^(?:alias\s+)?([^\s=]+)=(['"]?)(.*)\2\s*$""")
+
+# Home directory, resolved once at import for cd and ~ expansion
+_HOME_DIR = os.path.expanduser("~")
+
+# Shell used for commands that need shell parsing, resolved once at import (zsh preferred)
+_SHELL_EXECUTABLE = shutil.which('zsh') or shutil.which('bash') or '/bin/sh'
+
+# Shell syntax that requires shell=True: operators ('>>', '<<', '&&', '||' are covered by their
+# single-char forms) and '$' for variable expansion and command substitution
+_SHELL_OPERATOR_RE = re.compile(r'[|<>&;()`$]')
+# Tilde, glob and brace expansion; interactive commands are launched through the shell when present
+_SHELL_EXPANSION_RE = re.compile(r'[~*?\[{]')
+# Characters that give shlex.split a different result from str.split (quoting, escapes, comments)
+_SHLEX_SYNTAX_RE = re.compile(r'[\'"\\#]')
+
+# Virtual environment indicators, matched against lowercased paths and script content
+_VENV_PATH_RE = re.compile(r'activate|env')
+_VENV_CONTENT_RE = re.compile(r'virtual_env|venv|activate|pipenv|poetry|virtualenv|pyenv|asdf|rvm|rbenv|nvm|fnm')
+_VENV_SCAN_LIMIT = 4096
+
+
+def _debug_noop(message: str, *args):
+    """Debug printer used when debug mode is disabled; the message is never formatted."""
+
+
+def _expand_home(path: str) -> str:
+    """Expand a leading '~' with the cached home directory; '~user' falls back to expanduser."""
+    if path == "~" or path.startswith("~/"):
+        # Like expanduser: drop the home's trailing separator so HOME=/ gives '/x', not '//x'
+        return (_HOME_DIR.rstrip(os.sep) + path[1:]) or os.sep
+    return os.path.expanduser(path)
+
+
+# PATH lookups for bare program names; misses are not cached so newly installed tools are found
+_EXECUTABLE_CACHE: Dict[str, str] = {}
+
+
+def _resolve_executable(name: str) -> Optional[str]:
+    """Resolve a program name on PATH, reusing earlier successful lookups."""
+    if os.sep in name:
+        # Explicit paths are relative to the command's cwd, leave them to exec
+        return name
+    path = _EXECUTABLE_CACHE.get(name)
+    if path is None:
+        path = shutil.which(name)
+        if path is not None:
+            _EXECUTABLE_CACHE[name] = path
+    return path
+
+
+def show_current_directory(cwd: str) -> str:
+    """Show the current working directory."""
+    return f"Current directory: {cwd}"
+
+
+def _is_word(token: str) -> bool:
+    """Check that a token only holds word characters (letters, digits, underscore)."""
+    return token.replace('_', 'a').isalnum()
+
+
+def _first_token(command: str) -> str:
+    """Return the lowercased first word of a command without a full shlex parse."""
+    parts = command.split(None, 1)
+    if not parts:
+        return ""
+    return parts[0].strip('\'"').lower()
+
+
+def _split_args(command: str) -> List[str]:
+    """Split a command into arguments, using shlex only when quoting or escapes are present."""
+    if _SHLEX_SYNTAX_RE.search(command) is None:
+        return command.split()
+    return shlex.split(command)
+
+
+# Captured output is kept as a bounded tail so runaway commands cannot exhaust memory
+_MAX_OUTPUT_LINES = 10000
+_MAX_ERROR_LINES = 1000
+# Characters kept per stream, so output without newlines (find -print0, minified JSON) stays bounded too
+_MAX_OUTPUT_CHARS = 4 * 1024 * 1024
+_MAX_ERROR_CHARS = 1024 * 1024
+# Longest piece read at once; longer lines are read and trimmed in pieces of this size
+_READ_CHUNK_CHARS = 64 * 1024
+# Upper bound on memoised alias resolutions before the memo is reset
+_RESOLVE_MEMO_SIZE = 1024
+
+
+class _OutputTail:
+    """Keeps the last lines read from a stream, up to a line and character budget, and counts the ones dropped."""
+
+    __slots__ = ('lines', 'dropped', 'size', 'max_lines', 'max_size', '_mid_line')
+
+    def __init__(self, max_lines: int, max_size: int):
+        self.lines = deque()
+        self.dropped = 0
+        self.size = 0
+        self.max_lines = max_lines
+        self.max_size = max_size
+        # Whether the last dropped piece ended inside a line, so its rest is not counted again
+        self._mid_line = False
+
+    def consume(self, stream):
+        lines = self.lines
+        for piece in iter(functools.partial(stream.readline, _READ_CHUNK_CHARS), ''):
+            lines.append(piece)
+            self.size += len(piece)
+            while len(lines) > self.max_lines or self.size > self.max_size:
+                dropped = lines.popleft()
+                self.size -= len(dropped)
+                if not self._mid_line:
+                    self.dropped += 1
+                self._mid_line = not dropped.endswith('\n')
+
+    def text(self) -> str:
+        output = "".join(self.lines)
+        if self.dropped:
+            output = f"... ({self.dropped} earlier lines truncated)\n{output}"
+        return output
+
+
+def _run_captured(args, cwd: str, timeout: float, **popen_kwargs) -> subprocess.CompletedProcess:
+    """Run a command like subprocess.run(capture_output=True) but keep only the tail of its output."""
+    stdout_tail = _OutputTail(_MAX_OUTPUT_LINES, _MAX_OUTPUT_CHARS)
+    stderr_tail = _OutputTail(_MAX_ERROR_LINES, _MAX_ERROR_CHARS)
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        cwd=cwd,
+        **popen_kwargs
+    )
+    readers = [
+        (threading.Thread(target=stdout_tail.consume, args=(process.stdout,), daemon=True), process.stdout),
+        (threading.Thread(target=stderr_tail.consume, args=(process.stderr,), daemon=True), process.stderr)
+    ]
+    for reader, _ in readers:
+        reader.start()
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        # Background children may still hold the pipes open; don't wait on them indefinitely
+        # and only close a pipe once its reader is done with it
+        deadline = time.monotonic() + 1
+        for reader, stream in readers:
+            reader.join(timeout=max(0, deadline - time.monotonic()))
+            if not reader.is_alive():
+                stream.close()
+    return subprocess.CompletedProcess(args, returncode, stdout_tail.text(), stderr_tail.text())
 
 
 class ShellCommandHandler:
     """Detects and executes known shell commands directly."""
     
-    BASIC_COMMANDS = {'ls', 'll', 'pwd', 'mkdir', 'rm', 'cp', 'grep', 'find', 'cat', 'head', 'tail', 'sort', 'uniq', 'wc', 'echo', 'which', 'ps'}
-    NAVIGATION_COMMANDS = {'cd'}
-    SOURCE_COMMANDS = {'source', '.'}
-    COMMAND_PATTERNS = [
-        r'^which\s+\w+$',                    # which <executable>
-        r'^source\s+\S+$',                   # source <file>
-        r'^source\s+\S+\s+\S+$',             # source <file> <args>
-        r'^\.\s+\S+$',                       # . <file> (alternative to source)
-        r'^\.\s+\S+\s+\S+$',                 # . <file> <args>
-        r'^git\s+\w+$',                      # git <subcommand>
-        r'^git\s+\w+\s+\w+$',                # git <subcommand> <argument>
-        r'^git\s+\w+\s+\w+\s+\w+$',          # git <subcommand> <arg1> <arg2>
+    __slots__ = ('debug', 'no_confirm', '_aliases_cache', '_aliases_loaded', '_aliases_lock', '_debug_print', '_resolve_memo')
+    
+    BASIC_COMMANDS = frozenset({'ls', 'll', 'pwd', 'mkdir', 'rm', 'cp', 'grep', 'find', 'cat', 'head', 'tail', 'sort', 'uniq', 'wc', 'echo', 'which', 'ps'})
+    NAVIGATION_COMMANDS = frozenset({'cd'})
+    SOURCE_COMMANDS = frozenset({'source', '.'})
+    # Tools recognised together with their arguments: tool -> (min args, max args).
+    # Bounded tools only accept word arguments (git <subcommand> <arg>, apt install <package>, ...);
+    # a max of None accepts any arguments (docker ps -a, podman run --rm ...).
+    TOOL_ARGUMENT_LIMITS = {
+        'git': (1, 3),
         
         # Package manager commands
-        r'^apt\s+\w+$',                      # apt <command>
-        r'^apt\s+\w+\s+\w+$',                # apt <command> <package>
-        r'^brew\s+\w+$',                     # brew <command>
-        r'^brew\s+\w+\s+\w+$',               # brew <command> <package>
-        r'^pip\s+\w+$',                      # pip <command>
-        r'^pip\s+\w+\s+\w+$',                # pip <command> <package>
-        r'^npm\s+\w+$',                      # npm <command>
-        r'^npm\s+\w+\s+\w+$',                # npm <command> <package>
-        r'^yarn\s+\w+$',                     # yarn <command>
-        r'^yarn\s+\w+\s+\w+$',               # yarn <command> <package>
-        r'^cargo\s+\w+$',                    # cargo <command>
-        r'^cargo\s+\w+\s+\w+$',              # cargo <command> <package>
-        r'^go\s+\w+$',                       # go <command>
-        r'^go\s+\w+\s+\w+$',                 # go <command> <package>
-        r'^gem\s+\w+$',                      # gem <command>
-        r'^gem\s+\w+\s+\w+$',                # gem <command> <package>
-        r'^snap\s+\w+$',                     # snap <command>
-        r'^snap\s+\w+\s+\w+$',               # snap <command> <package>
-        r'^flatpak\s+\w+$',                  # flatpak <command>
-        r'^flatpak\s+\w+\s+\w+$',            # flatpak <command> <package>
-        r'^pacman\s+\w+$',                   # pacman <command>
-        r'^pacman\s+\w+\s+\w+$',             # pacman <command> <package>
-        r'^zypper\s+\w+$',                   # zypper <command>
-        r'^zypper\s+\w+\s+\w+$',             # zypper <command> <package>
-        r'^dnf\s+\w+$',                      # dnf <command>
-        r'^dnf\s+\w+\s+\w+$',                # dnf <command> <package>
-        r'^yum\s+\w+$',                      # yum <command>
-        r'^yum\s+\w+\s+\w+$',                # yum <command> <package>
+        **dict.fromkeys(
+            ('apt', 'brew', 'pip', 'npm', 'yarn', 'cargo', 'go', 'gem', 'snap', 'flatpak', 'pacman', 'zypper', 'dnf', 'yum'),
+            (1, 2)
+        ),
         
         # Docker commands
-        r'^docker\s+.*$',                     # any docker command
-        r'^podman\s+.*$',                     # any podman command
-    ]
-    EDITORS = {'vi', 'vim', 'emacs', 'nano'}
-    INTERACTIVE_COMMANDS = {
+        'docker': (1, None),
+        'podman': (1, None),
+    }
+    EDITORS = frozenset({'vi', 'vim', 'emacs', 'nano'})
+    INTERACTIVE_COMMANDS = frozenset({
         'top', 'htop', 'btop', 'bashtop', 'atop', 'glances', 'less', 'more', 'most', 'iftop', 'iotop', 'nethogs', 'nload', 'slurm', 'ttyplot',
         'man', 'info', 'ncdu', 'asciiquarium', 'cmatrix', 'hollywood', 'python', 'python3', 'node', 'nodejs', 'irb', 'pry', 'ghci', 'gdb', 'lldb'
+    })
+    # Every base command recognised without a tool match, for a single-probe lookup
+    ALL_BASE_COMMANDS = BASIC_COMMANDS | EDITORS | INTERACTIVE_COMMANDS | NAVIGATION_COMMANDS | SOURCE_COMMANDS
+    # Anchored alternation over ALL_BASE_COMMANDS, so recognition needs no split
+    BASE_COMMAND_RE = re.compile(
+        r'(?:' + '|'.join(map(re.escape, sorted(ALL_BASE_COMMANDS, key=len, reverse=True))) + r')(?:\s|$)'
+    )
+    # Base command -> category, so execute_command can route with one dict lookup
+    COMMAND_TYPES = {
+        **dict.fromkeys(BASIC_COMMANDS, 'basic'),
+        **dict.fromkeys(NAVIGATION_COMMANDS, 'navigation'),
+        **dict.fromkeys(SOURCE_COMMANDS, 'source'),
+        **dict.fromkeys(EDITORS, 'editor'),
+        **dict.fromkeys(INTERACTIVE_COMMANDS, 'interactive'),
+    }
+    # Interactive base command -> (command type, action) used in the completion message
+    INTERACTIVE_KINDS = {
+        **dict.fromkeys(EDITORS, ('text editor', 'editing')),
+        **dict.fromkeys(INTERACTIVE_COMMANDS, ('system command', 'monitoring')),
     }
 
     def __init__(self, debug: bool = False, no_confirm: bool = False):
@@ -72,37 +229,55 @@ class ShellCommandHandler:
         self.no_confirm = no_confirm
         self._aliases_cache = {}
         self._aliases_loaded = False
+        # Memoised resolve_alias results, keyed by the raw command string
+        self._resolve_memo = {}
+        # Guards alias loading; a background preload holds it until the cache is filled
+        self._aliases_lock = threading.Lock()
+        # Resolve the debug branch once; non-debug instances get a no-op printer
+        self._debug_print = self._print_debug if debug else _debug_noop
     
-    def _debug_print(self, message: str):
-        if self.debug:
-            print(f"shell_commands | {message}")
+    def _print_debug(self, message: str, *args):
+        # Arguments are %-formatted here only, so disabled debug output costs no string building
+        print(f"shell_commands | {message % args if args else message}")
     
     def is_shell_command(self, command: str) -> bool:
-        if not command or not command.strip():
+        if not command:
+            return False
+        command = command.strip()
+        if not command:
             return False
         
         # First, resolve alias if applicable
         resolved = self.resolve_alias(command)
         if resolved:
-            command = resolved
-        command = command.strip().lower()
-        base = command.split()[0].lower()
-
-        if (base in self.BASIC_COMMANDS or 
-            base in self.EDITORS or 
-            base in self.INTERACTIVE_COMMANDS or 
-            base in self.NAVIGATION_COMMANDS or
-            base in self.SOURCE_COMMANDS):
-            self._debug_print(f'{command} is a shell command (base match)')
-            return True
+            command = resolved.strip()
+        command = command.lower()
 
-        # Check if command matches any known command patterns
-        for pattern in self.COMMAND_PATTERNS:
-            if re.match(pattern, command.strip()):
-                self._debug_print(f'{command} is a shell command (pattern match)')
-                return True
+        match_kind = self._classify(command)
+        if match_kind:
+            self._debug_print('%s is a shell command (%s)', command, match_kind)
+            return True
         return False
     
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _classify(command: str) -> Optional[str]:
+        """Classify a stripped, lowercased, alias-resolved command; returns the match kind or None."""
+        if ShellCommandHandler.BASE_COMMAND_RE.match(command):
+            return "base match"
+
+        # Check if command is a known tool invocation with an accepted argument shape
+        tool, *arguments = command.split()
+        limits = ShellCommandHandler.TOOL_ARGUMENT_LIMITS.get(tool)
+        if limits:
+            min_args, max_args = limits
+            if max_args is None:
+                if len(arguments) >= min_args:
+                    return "tool match"
+            elif min_args <= len(arguments) <= max_args and all(map(_is_word, arguments)):
+                return "tool match"
+        return None
+    
     def execute_command(self, command: str, cwd: str = ".") -> Tuple[bool, str, Optional[int], str]:
        
         # Resolve alias before execution
@@ -110,23 +285,43 @@ class ShellCommandHandler:
         if resolved_command:
             command = resolved_command
 
+        # Normalize once and route on the first token
+        command = command.strip()
+        base_command = _first_token(command)
+        
+        # 'll' is usually a shell alias rather than a binary; use its common expansion when no alias resolved it
+        if base_command == 'll':
+            arguments = command.split(None, 1)[1:]
+            command = ' '.join(['ls -la', *arguments])
+            base_command = 'ls'
+        elif command == 'pwd':
+            # The tracked cwd already is the working directory; answer without spawning a process
+            return True, os.path.abspath(cwd), 0, cwd
+
+        command_kind = self.COMMAND_TYPES.get(base_command)
+
+        if command_kind == 'navigation' or command_kind == 'source':
+            # cd and source are interpreted here rather than by a shell, so unbalanced quotes are reported here too
+            try:
+                parts = _split_args(command)
+            except ValueError as e:
+                return False, f"❌ Command execution error: {command}\nError: {str(e)}", 1, cwd
+
         # Check if this is a navigation command (cd)
-        is_navigation = self.is_navigation_command(command)
-        if is_navigation:
+        if command_kind == 'navigation':
             # Handle cd command specially - it changes working directory
-            success, message, new_cwd = self.change_directory(command, cwd)
+            success, message, new_cwd = self._change_directory(parts, cwd)
             if success:
                 # Show the new working directory after successful cd
-                message += f"\n{self.show_current_directory(new_cwd)}"
+                message += f"\nCurrent directory: {new_cwd}"
                 return True, message, 0, new_cwd
             else:
                 return False, message, 1, cwd
         
         # Check if this is a source command
-        is_source = self.is_source_command(command)
-        if is_source:
+        if command_kind == 'source':
             # Handle source command specially - it can modify environment
-            success, message, _ = self.handle_source_command(command, cwd)
+            success, message, _ = self._handle_source_command(parts, cwd)
             if success:
                 return True, message, 0, cwd
             else:
@@ -134,63 +329,56 @@ class ShellCommandHandler:
         
         
         # Check if this is an interactive command (editor or system command)
-        parts = shlex.split(command.strip())
-        base_command = parts[0].lower()
-        is_interactive = base_command in self.EDITORS or base_command in self.INTERACTIVE_COMMANDS
+        interactive_kind = self.INTERACTIVE_KINDS.get(base_command)
+        
+        # Check if command contains shell operators that require shell=True
+        needs_shell = _SHELL_OPERATOR_RE.search(command) is not None
         
         try:
-            if is_interactive:
+            # Tokenize once, and only when the command is exec'd without a shell
+            parts = None if needs_shell else _split_args(command)
+            
+            if interactive_kind:
                 # For interactive commands, start them in the foreground
-                if base_command in self.EDITORS:
-                    command_type = "text editor"
-                    action = "editing"
-                else:
-                    command_type = "system command"
-                    action = "monitoring"
+                command_type, action = interactive_kind
                 
                 # Interactive command handling
                 # Note: This will block until the command is closed
-                process_result = subprocess.run(
-                    command,
-                    shell=True,
-                    executable="/bin/zsh",
-                    cwd=cwd
-                )
+                if needs_shell or _SHELL_EXPANSION_RE.search(command):
+                    process_result = subprocess.run(
+                        command,
+                        shell=True,
+                        executable=_SHELL_EXECUTABLE,
+                        cwd=cwd
+                    )
+                else:
+                    # Simple invocation - exec the program directly without a zsh wrapper
+                    process_result = subprocess.run(parts, cwd=cwd)
                 return True, f"✅ Interactive {command_type} {base_command} finished {action} (exit code: {process_result.returncode})", process_result.returncode, cwd
             else:
                 # Regular command execution with output capture
-                
-                # Check if command contains shell operators that require shell=True
-                shell_operators = ['|', '>', '<', '>>', '<<', '&&', '||', ';', '(', ')', '`', '$(']
-                needs_shell = any(op in command for op in shell_operators)
-                
                 if needs_shell:
                     # Use shell=True for commands with operators
-                    process_result = subprocess.run(
+                    process_result = _run_captured(
                         command,
-                        shell=True,
-                        executable="/bin/zsh",
-                        capture_output=True,
-                        text=True,
                         cwd=cwd,
-                        timeout=30
+                        timeout=30,
+                        shell=True,
+                        executable=_SHELL_EXECUTABLE
                     )
                 else:
-                    # Use shlex.split for simple commands without operators
-                    args = shlex.split(command)
-                    process_result = subprocess.run(
-                        args,
-                        capture_output=True,
-                        text=True,
-                        cwd=cwd,
-                        timeout=30
-                    )
+                    # Use the split args for simple commands without operators
+                    executable = _resolve_executable(parts[0])
+                    if executable is None:
+                        return False, f"❌ Command not found: {command}", None, cwd
+                    # argv[0] stays as typed, so the program's messages name it the way the user did
+                    process_result = _run_captured(parts, cwd=cwd, timeout=30, executable=executable)
                 
                 if process_result.returncode == 0:
-                    output = process_result.stdout.strip() if process_result.stdout.strip() else "✅ Command executed successfully"
+                    output = process_result.stdout.strip() or "✅ Command executed successfully"
                     return True, output, process_result.returncode, cwd
                 else:
-                    error_msg = process_result.stderr.strip() if process_result.stderr.strip() else "Command failed with no error output"
+                    error_msg = process_result.stderr.strip() or "Command failed with no error output"
                     return False, f"❌ Command failed: {error_msg}", process_result.returncode, cwd
                  
         except subprocess.TimeoutExpired:
@@ -200,56 +388,39 @@ class ShellCommandHandler:
         except Exception as e:
             return False, f"❌ Command execution error: {command}\nError: {str(e)}", None, cwd
   
-    def is_interactive_command(self, command: str) -> bool:
+    @staticmethod
+    def is_interactive_command(command: str) -> bool:
         """Check if a command is interactive (editor or system command)."""
-        if not command or not command.strip():
-            return False
-        
-        parts = shlex.split(command.strip())
-        if not parts:
-            return False
-        
-        base_command = parts[0].lower()
-        return base_command in self.EDITORS or base_command in self.INTERACTIVE_COMMANDS
+        return _first_token(command) in ShellCommandHandler.INTERACTIVE_KINDS
 
-    def is_navigation_command(self, command: str) -> bool:
+    @staticmethod
+    def is_navigation_command(command: str) -> bool:
         """Check if a command is a navigation command (cd)."""
-        if not command or not command.strip():
-            return False
-        
-        parts = shlex.split(command.strip())
-        if not parts:
-            return False
-        
-        base_command = parts[0].lower()
-        return base_command in self.NAVIGATION_COMMANDS
+        base_command = _first_token(command)
+        return base_command in ShellCommandHandler.NAVIGATION_COMMANDS
     
-    def is_source_command(self, command: str) -> bool:
+    @staticmethod
+    def is_source_command(command: str) -> bool:
         """Check if a command is a source command (source or .)."""
-        if not command or not command.strip():
-            return False
-        
-        parts = shlex.split(command.strip())
-        if not parts:
-            return False
-        
-        base_command = parts[0].lower()
-        return base_command in self.SOURCE_COMMANDS
+        base_command = _first_token(command)
+        return base_command in ShellCommandHandler.SOURCE_COMMANDS
 
     def change_directory(self, command: str, current_cwd: str) -> Tuple[bool, str, str]:
         """Handle cd command and return new working directory."""
-        self._debug_print(f"change_directory called with command: '{command}', current_cwd: '{current_cwd}'")
+        self._debug_print("change_directory called with command: '%s', current_cwd: '%s'", command, current_cwd)
         
         if not self.is_navigation_command(command):
-            self._debug_print(f"command '{command}' is not a navigation command")
+            self._debug_print("command '%s' is not a navigation command", command)
             return False, "Not a navigation command", current_cwd
         
-        parts = shlex.split(command.strip())
+        return self._change_directory(_split_args(command), current_cwd)
+    
+    def _change_directory(self, parts: List[str], current_cwd: str) -> Tuple[bool, str, str]:
+        """Resolve the target of an already tokenized cd command."""
         if len(parts) < 2:
             # cd without arguments goes to home directory
-            import os
-            home_dir = os.path.expanduser("~")
-            self._debug_print(f"cd: changing to home directory: {home_dir}")
+            home_dir = _HOME_DIR
+            self._debug_print("cd: changing to home directory: %s", home_dir)
             return True, f"✅ Changed directory to: {home_dir}", home_dir
         
         target_path = parts[1]
@@ -262,13 +433,11 @@ class ShellCommandHandler:
         
         # Handle ~ for home directory
         if target_path.startswith("~"):
-            import os
-            home_dir = os.path.expanduser(target_path)
-            self._debug_print(f"cd: expanding home directory: {target_path} -> {home_dir}")
+            home_dir = _expand_home(target_path)
+            self._debug_print("cd: expanding home directory: %s -> %s", target_path, home_dir)
             target_path = home_dir
         
         # Resolve relative paths
-        import os
         if os.path.isabs(target_path):
             # Absolute path
             new_cwd = target_path
@@ -279,26 +448,37 @@ class ShellCommandHandler:
         # Normalize the path
         new_cwd = os.path.normpath(new_cwd)
         
-        # Check if directory exists
-        if not os.path.isdir(new_cwd):
+        # Check if directory exists (single stat gives both existence and type)
+        try:
+            st = os.stat(new_cwd)
+        except (FileNotFoundError, NotADirectoryError):
             return False, f"❌ Directory does not exist: {new_cwd}", current_cwd
+        except PermissionError:
+            return False, f"❌ Permission denied accessing directory: {new_cwd}", current_cwd
+        except OSError as e:
+            return False, f"❌ Cannot access directory: {new_cwd} ({e.strerror})", current_cwd
+        if not stat.S_ISDIR(st.st_mode):
+            return False, f"❌ Not a directory: {new_cwd}", current_cwd
         
-        # Check if we have permission to access
-        if not os.access(new_cwd, os.R_OK):
+        # Check if we have permission to access (entering a directory only needs search permission)
+        if not os.access(new_cwd, os.X_OK):
             return False, f"❌ Permission denied accessing directory: {new_cwd}", current_cwd
         
-        self._debug_print(f"cd: changing from {current_cwd} to {new_cwd}")
+        self._debug_print("cd: changing from %s to %s", current_cwd, new_cwd)
         return True, f"✅ Changed directory to: {new_cwd}", new_cwd
     
     def handle_source_command(self, command: str, current_cwd: str) -> Tuple[bool, str, str]:
         """Handle source command and return updated environment info."""
-        self._debug_print(f"handle_source_command called with command: '{command}', current_cwd: '{current_cwd}'")
+        self._debug_print("handle_source_command called with command: '%s', current_cwd: '%s'", command, current_cwd)
         
         if not self.is_source_command(command):
-            self._debug_print(f"command '{command}' is not a source command")
+            self._debug_print("command '%s' is not a source command", command)
             return False, "Not a source command", current_cwd
         
-        parts = shlex.split(command.strip())
+        return self._handle_source_command(_split_args(command), current_cwd)
+    
+    def _handle_source_command(self, parts: List[str], current_cwd: str) -> Tuple[bool, str, str]:
+        """Analyze the file of an already tokenized source command."""
         if len(parts) < 2:
             return False, "❌ Source command requires a file argument", current_cwd
         
@@ -306,7 +486,7 @@ class ShellCommandHandler:
         
         # Handle special cases
         if source_file.startswith("~"):
-            source_file = os.path.expanduser(source_file)
+            source_file = _expand_home(source_file)
         
         # Resolve relative paths
         if not os.path.isabs(source_file):
@@ -328,12 +508,14 @@ class ShellCommandHandler:
             with open(source_file, 'r') as f:
                 content = f.read()
             
+            content_lower = content.lower()
+            
             # Analyze what the source file does
             analysis = self._analyze_source_file(content, source_file)
             
             # For virtual environments, try to detect and activate them
-            if self._is_virtual_environment_file(source_file, content):
-                venv_info = self._activate_virtual_environment(source_file, current_cwd)
+            if self._is_virtual_environment_file(source_file, content_lower):
+                venv_info = self._activate_virtual_environment(source_file, content_lower, current_cwd)
                 if venv_info:
                     return True, f"✅ Virtual environment activated: {venv_info}\n\n{analysis}", current_cwd
             
@@ -403,53 +585,23 @@ class ShellCommandHandler:
         
         return "\n".join(analysis)
     
-    def _is_virtual_environment_file(self, file_path: str, content: str) -> bool:
+    def _is_virtual_environment_file(self, file_path: str, content_lower: str) -> bool:
         """Check if a source file is a virtual environment activation script."""
-        # Common patterns for virtual environment activation
-        venv_indicators = [
-            'VIRTUAL_ENV',
-            'venv',
-            'activate',
-            'deactivate',
-            'conda activate',
-            'conda deactivate',
-            'pipenv',
-            'poetry',
-            'virtualenv',
-            'pyenv',
-            'asdf',
-            'rvm',
-            'rbenv',
-            'nvm',
-            'n',
-            'fnm'
-        ]
-        
         # Check file path
-        file_lower = file_path.lower()
-        if any(indicator in file_lower for indicator in ['activate', 'venv', 'env']):
+        if _VENV_PATH_RE.search(file_path.lower()):
             return True
         
-        # Check content
-        content_lower = content.lower()
-        if any(indicator in content_lower for indicator in venv_indicators):
+        # Check content - activation markers are declared near the top of the script
+        if _VENV_CONTENT_RE.search(content_lower, 0, _VENV_SCAN_LIMIT):
             return True
         
         return False
     
-    def _activate_virtual_environment(self, source_file: str, current_cwd: str) -> Optional[str]:
+    def _activate_virtual_environment(self, source_file: str, content_lower: str, current_cwd: str) -> Optional[str]:
         """Attempt to activate a virtual environment and return info about it."""
         try:
             # Try to detect the type of virtual environment based on content and path
             file_lower = source_file.lower()
-            content_lower = ""
-            
-            # Try to read the content to analyze it
-            try:
-                with open(source_file, 'r') as f:
-                    content_lower = f.read().lower()
-            except:
-                pass
             
             # Check for specific virtual environment types
             if 'conda' in file_lower or 'conda' in content_lower:
@@ -462,22 +614,33 @@ class ShellCommandHandler:
                 return "Virtualenv environment detected"
             elif 'pyenv' in file_lower or 'pyenv' in content_lower:
                 return "Pyenv environment detected"
-            elif 'venv' in file_lower or 'activate' in file_lower or 'VIRTUAL_ENV' in content_lower:
+            elif 'venv' in file_lower or 'activate' in file_lower or 'virtual_env' in content_lower:
                 # Standard Python venv
                 venv_dir = os.path.dirname(source_file)
+                # Activation scripts live in <venv>/bin (or <venv>\Scripts on Windows)
+                if os.path.basename(venv_dir) in ('bin', 'Scripts'):
+                    venv_dir = os.path.dirname(venv_dir)
                 
-                # Check for different Python executable locations
-                python_paths = [
-                    os.path.join(venv_dir, 'bin', 'python'),
-                    os.path.join(venv_dir, 'bin', 'python3'),
-                    os.path.join(venv_dir, 'Scripts', 'python.exe'),  # Windows
-                    os.path.join(venv_dir, 'Scripts', 'python3.exe')  # Windows
+                # Prefer the version recorded in pyvenv.cfg over spawning the interpreter
+                version = self._read_pyvenv_version(venv_dir)
+                if version:
+                    return f"Python venv: {version} at {venv_dir}"
+                
+                # Check for different Python executable locations with one directory listing each
+                python_locations = [
+                    ('bin', ('python', 'python3')),
+                    ('Scripts', ('python.exe', 'python3.exe'))  # Windows
                 ]
                 
                 python_path = None
-                for path in python_paths:
-                    if os.path.exists(path):
-                        python_path = path
+                for bin_dir, names in python_locations:
+                    try:
+                        with os.scandir(os.path.join(venv_dir, bin_dir)) as entries:
+                            found = {entry.name: entry.path for entry in entries}
+                    except OSError:
+                        continue
+                    python_path = next((found[name] for name in names if name in found), None)
+                    if python_path:
                         break
                 
                 if python_path:
@@ -501,38 +664,67 @@ class ShellCommandHandler:
                 return "Virtual environment (type unknown)"
                 
         except Exception as e:
-            self._debug_print(f"Error detecting virtual environment: {e}")
+            self._debug_print("Error detecting virtual environment: %s", e)
             return None
     
-    def show_current_directory(self, cwd: str) -> str:
+    def _read_pyvenv_version(self, venv_dir: str) -> Optional[str]:
+        """Read the Python version recorded in a venv's pyvenv.cfg, if present."""
+        try:
+            with open(os.path.join(venv_dir, 'pyvenv.cfg'), 'r') as f:
+                for line in f:
+                    key, sep, value = line.partition('=')
+                    # venv writes 'version', virtualenv writes 'version_info' (e.g. 3.11.7.final.0)
+                    if sep and key.strip() in ('version', 'version_info'):
+                        return f"Python {'.'.join(value.strip().split('.')[:3])}"
+        except OSError:
+            pass
+        return None
+    
+    @staticmethod
+    def show_current_directory(cwd: str) -> str:
         """Show the current working directory."""
-        return f"Current directory: {cwd}"
+        return show_current_directory(cwd)
 
     def resolve_alias(self, command: str) -> Optional[str]:
         """Resolve shell alias to its actual command."""
         if not command or not command.strip():
             return None
         
+        memo = self._resolve_memo
+        if command in memo:
+            return memo[command]
+        
         # Load aliases if not already loaded
-        if not self._aliases_loaded:
-            self._load_aliases()
+        self._ensure_aliases_loaded()
         
-        # Get the base command (first word)
-        base_command = command.split()[0].strip()
+        # Split off the base command (first word) once; the arguments are kept verbatim
+        base_command, *rest = command.split(None, 1)
         
         # Check if we have this alias cached
-        if base_command in self._aliases_cache:
-            alias_value = self._aliases_cache[base_command]
-            self._debug_print(f"Resolved alias '{base_command}' -> '{alias_value}'")
-            
-            # Replace the base command with the alias value
-            if len(command.split()) > 1:
-                # Keep the arguments
-                return f"{alias_value} {' '.join(command.split()[1:])}"
-            else:
-                return alias_value
-        
-        return None
+        resolved = None
+        alias_value = self._aliases_cache.get(base_command)
+        if alias_value is not None:
+            self._debug_print("Resolved alias '%s' -> '%s'", base_command, alias_value)
+            # Replace the base command with the alias value, keeping the arguments
+            resolved = f"{alias_value} {rest[0].rstrip()}" if rest else alias_value
+        
+        if len(memo) >= _RESOLVE_MEMO_SIZE:
+            memo.clear()
+        memo[command] = resolved
+        return resolved
+    
+    def _ensure_aliases_loaded(self):
+        """Load aliases on first use, or wait for a preload that is already running."""
+        if self._aliases_loaded:
+            return
+        with self._aliases_lock:
+            if not self._aliases_loaded:
+                self._load_aliases()
+    
+    def _preload_aliases(self):
+        """Start loading aliases on a background thread so the first command does not wait on the alias shell."""
+        if not self._aliases_loaded:
+            threading.Thread(target=self._ensure_aliases_loaded, daemon=True).start()
     
     def _load_aliases(self):
         """Load shell aliases from configuration files and shell."""
@@ -545,14 +737,14 @@ class ShellCommandHandler:
                 capture_output=True,
                 text=True,
                 shell=True,
-                executable="/bin/zsh"
+                executable=_SHELL_EXECUTABLE
             )
             
             if result.returncode == 0:
                 self._parse_alias_output(result.stdout)
             
         except Exception as e:
-            self._debug_print(f"Failed to load aliases from shell: {e}")
+            self._debug_print("Failed to load aliases from shell: %s", e)
         
         # Also try to read from common shell config files
         self._load_aliases_from_files()
@@ -561,20 +753,11 @@ class ShellCommandHandler:
     
     def _parse_alias_output(self, alias_output: str):
         """Parse the output of the 'alias' command."""
-        for line in alias_output.strip().split('\n'):
-            if '=' in line:
-                # Format: alias name='value' or alias name="value"
-                parts = line.split('=', 1)
-                if len(parts) == 2:
-                    alias_name = parts[0].replace('alias ', '').strip()
-                    alias_value = parts[1].strip()
-                    
-                    # Remove quotes if present
-                    if (alias_value.startswith("'") and alias_value.endswith("'")) or \
-                       (alias_value.startswith('"') and alias_value.endswith('"')):
-                        alias_value = alias_value[1:-1]
-                    
-                    self._aliases_cache[alias_name] = alias_value
+        for line in alias_output.splitlines():
+            # Format: alias name='value' (bash) or name='value' (zsh)
+            match = _ALIAS_RE.match(line)
+            if match:
+                self._aliases_cache[match.group(1)] = match.group(3)
     
     def _load_aliases_from_files(self):
         """Load aliases from common shell configuration files."""
@@ -586,49 +769,56 @@ class ShellCommandHandler:
         ]
         
         for config_file in config_files:
-            if os.path.exists(config_file):
-                try:
-                    with open(config_file, 'r') as f:
-                        content = f.read()
-                        self._parse_config_file(content)
-                except Exception as e:
-                    self._debug_print(f"Failed to read {config_file}: {e}")
+            try:
+                # Stream the file rather than reading it whole; most lines are not aliases
+                with open(config_file, 'r') as f:
+                    self._parse_config_file(f)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                self._debug_print("Failed to read %s: %s", config_file, e)
     
-    def _parse_config_file(self, content: str):
-        """Parse shell configuration file content for alias definitions."""
-        for line in content.split('\n'):
+    def _parse_config_file(self, lines: Iterable[str]):
+        """Parse shell configuration file lines for alias definitions."""
+        for line in lines:
+            # Cheap substring test before any per-line string work
+            if 'alias' not in line:
+                continue
+            # Look for alias definitions: alias name='value' or alias name="value"
             line = line.strip()
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
+            if not line.startswith('alias '):
                 continue
-            
-            # Look for alias definitions
-            if line.startswith('alias '):
-                # Format: alias name='value' or alias name="value"
-                alias_part = line[6:]  # Remove 'alias ' prefix
-                if '=' in alias_part:
-                    parts = alias_part.split('=', 1)
-                    if len(parts) == 2:
-                        alias_name = parts[0].strip()
-                        alias_value = parts[1].strip()
-                        
-                        # Remove quotes if present
-                        if (alias_value.startswith("'") and alias_value.endswith("'")) or \
-                           (alias_value.startswith('"') and alias_value.endswith('"')):
-                            alias_value = alias_value[1:-1]
-                        
-                        # Only add if not already present (shell aliases take precedence)
-                        if alias_name not in self._aliases_cache:
-                            self._aliases_cache[alias_name] = alias_value
+            match = _ALIAS_RE.match(line)
+            if match:
+                # Only add if not already present (shell aliases take precedence)
+                self._aliases_cache.setdefault(match.group(1), match.group(3))
     
     def get_aliases(self) -> Dict[str, str]:
         """Get all loaded aliases."""
-        if not self._aliases_loaded:
-            self._load_aliases()
+        self._ensure_aliases_loaded()
         return self._aliases_cache.copy()
     
     def clear_aliases_cache(self):
         """Clear the aliases cache to force reloading."""
-        self._aliases_cache.clear()
-        self._aliases_loaded = False
-        self._debug_print("Aliases cache cleared")
\ No newline at end of file
+        with self._aliases_lock:
+            self._aliases_cache.clear()
+            self._resolve_memo.clear()
+            self._aliases_loaded = False
+        self._debug_print("Aliases cache cleared")
+
+
+@functools.lru_cache(maxsize=4)
+def _shared_handler(debug: bool, no_confirm: bool) -> ShellCommandHandler:
+    handler = ShellCommandHandler(debug=debug, no_confirm=no_confirm)
+    # Shared handlers serve a whole session, so overlap their alias load with start-up
+    handler._preload_aliases()
+    return handler
+
+
+def get_handler(debug: bool = False, no_confirm: bool = False) -> ShellCommandHandler:
+    """Get the shared ShellCommandHandler for these flags.
+
+    Preferred over constructing a handler per command: aliases are loaded once
+    and reused by every caller with the same configuration.
+    """
+    return _shared_handler(bool(debug), bool(no_confirm))
@@ -3,143 +3,202 @@
 Task complexity analyzer for determining when to use GPT-4o vs GPT-3.5-turbo.
 """
 
+import functools
 import re
 from typing import Dict, List, Tuple
 
 
+# Keywords that indicate complex reasoning tasks
+_COMPLEX_KEYWORDS = frozenset({
+    'analyze', 'debug', 'troubleshoot', 'investigate', 'diagnose',
+    'optimize', 'refactor', 'design', 'architect', 'plan', 'strategy',
+    'algorithm', 'logic', 'reasoning', 'problem-solving', 'complex',
+    'multi-step', 'multi step', 'complicated', 'sophisticated',
+    'performance', 'efficiency', 'scalability', 'maintainability',
+    'security', 'vulnerability', 'testing', 'validation', 'verification',
+    'integration', 'deployment', 'configuration', 'setup', 'environment',
+    'dependency', 'compatibility', 'migration', 'upgrade', 'downgrade',
+    'backup', 'restore', 'recovery', 'monitoring', 'logging',
+    'error handling', 'exception', 'edge case', 'corner case',
+    'data analysis', 'statistics', 'metrics', 'reporting',
+    'automation', 'scripting', 'workflow', 'pipeline',
+    # Query-specific complex keywords
+    'how to', 'what is the best way', 'why does', 'when should',
+    'which approach', 'compare', 'difference between', 'similarities',
+    'pros and cons', 'advantages', 'disadvantages', 'trade-offs',
+    'best practices', 'recommendations', 'suggestions', 'alternatives',
+    'considerations', 'implications', 'consequences', 'impact',
+    'evaluation', 'assessment', 'review', 'analysis of'
+})
+
+# Keywords that indicate simple tasks
+_SIMPLE_KEYWORDS = frozenset({
+    'list', 'show', 'display', 'print', 'echo', 'cat', 'ls', 'dir',
+    'count', 'find', 'search', 'grep', 'copy', 'cp', 'move', 'mv',
+    'delete', 'rm', 'remove', 'create', 'mkdir', 'touch', 'new',
+    'start', 'stop', 'restart', 'status', 'info', 'help',
+    'install', 'uninstall', 'update', 'upgrade', 'downgrade',
+    'check', 'verify', 'test', 'run', 'execute', 'launch'
+})
+
+# Patterns that indicate complex reasoning
+_COMPLEX_PATTERNS = (
+    r'\b(why|how|what if|suppose|imagine|consider)\b',
+    r'\b(if|when|unless|while|for|foreach)\b',
+    r'\b(and|or|but|however|nevertheless|therefore)\b',
+    r'\b(problem|issue|bug|error|failure|crash)\b',
+    r'\b(improve|enhance|better|faster|more efficient)\b',
+    r'\b(compare|contrast|difference|similarity)\b',
+    r'\b(before|after|during|while|until)\b',
+    r'\b(unless|otherwise|alternatively|instead)\b',
+    r'\b(complex|complicated|sophisticated|advanced)\b',
+    r'\b(multi.?step|multi.?stage|multi.?phase)\b',
+    r'\b(conditional|dependent|interdependent)\b',
+    r'\b(sequence|order|priority|dependency)\b',
+    r'\b(analysis|investigation|research|study)\b',
+    r'\b(design|architecture|structure|framework)\b',
+    r'\b(optimization|performance|efficiency|scalability)\b',
+    r'\b(security|vulnerability|threat|risk)\b',
+    r'\b(testing|validation|verification|quality)\b',
+    r'\b(integration|deployment|configuration|setup)\b',
+    r'\b(automation|scripting|workflow|pipeline)\b',
+    r'\b(monitoring|logging|alerting|tracking)\b',
+    # Query-specific complex patterns
+    r'\b(how to|what is the best way|why does|when should)\b',
+    r'\b(which approach|compare|difference between|similarities)\b',
+    r'\b(pros and cons|advantages|disadvantages|trade.?offs)\b',
+    r'\b(best practices|recommendations|suggestions|alternatives)\b',
+    r'\b(considerations|implications|consequences|impact)\b',
+    r'\b(evaluation|assessment|review|analysis of)\b',
+    r'\b(what would happen if|suppose that|imagine if)\b',
+    r'\b(under what circumstances|in what situations)\b',
+    r'\b(how would you|what would you recommend)\b',
+    r'\b(explain why|describe how|analyze the)\b'
+)
+
+# Patterns that indicate simple tasks
+_SIMPLE_PATTERNS = (
+    r'\b(list|show|display|print|echo)\b',
+    r'\b(count|find|search|grep)\b',
+    r'\b(copy|move|delete|remove|create)\b',
+    r'\b(start|stop|restart|status|info)\b',
+    r'\b(install|uninstall|update|upgrade)\b',
+    r'\b(check|verify|test|run|execute)\b',
+    r'^\s*[a-z]+\s+[a-z0-9_.-]+\s*$',  # Simple command pattern
+    r'^\s*[a-z]+\s+[a-z0-9_.-]+\s+[a-z0-9_.-]+\s*$',  # Command with 2 args
+)
+
+# Compiled once at import; each union is a cheap prefilter that skips the
+# per-pattern scan when none of its patterns can match
+_COMPLEX_REGEXES = tuple(re.compile(pattern) for pattern in _COMPLEX_PATTERNS)
+_COMPLEX_UNION_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in _COMPLEX_PATTERNS))
+_SIMPLE_REGEXES = tuple(re.compile(pattern) for pattern in _SIMPLE_PATTERNS)
+_SIMPLE_UNION_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in _SIMPLE_PATTERNS))
+
+# Words that signal the task needs reasoning; matched as whole words so 'how' does not hit 'show'
+_REASONING_INDICATORS = (
+    'why', 'how', 'what if', 'suppose', 'imagine', 'consider',
+    'problem', 'issue', 'bug', 'error', 'failure', 'crash',
+    'improve', 'enhance', 'better', 'faster', 'more efficient',
+    'compare', 'contrast', 'difference', 'similarity',
+    'unless', 'otherwise', 'alternatively', 'instead'
+)
+# Words that always call for complex reasoning (substring match, so 'debugging' counts)
+_FORCE_COMPLEX_WORDS = ('debug', 'troubleshoot', 'investigate', 'analyze')
+
+_REASONING_RE = re.compile(
+    r'\b(' + '|'.join(map(re.escape, sorted(_REASONING_INDICATORS, key=len, reverse=True))) + r')\b'
+)
+
+
+def _count_matching_patterns(union_re: re.Pattern, regexes: Tuple[re.Pattern, ...], text: str) -> int:
+    """Count how many of the patterns match the text.
+
+    Each pattern counts at most once, and patterns overlap (e.g. 'while', 'unless'),
+    so the union only decides whether the individual patterns need to be checked.
+    """
+    if not union_re.search(text):
+        return 0
+    return sum(1 for regex in regexes if regex.search(text))
+
+
 class TaskComplexityAnalyzer:
     """Analyzes task complexity to determine the appropriate LLM model."""
     
     def __init__(self, debug: bool = False):
         self.debug = debug
         
-        # Keywords that indicate complex reasoning tasks
-        self.complex_keywords = {
-            'analyze', 'analyze', 'debug', 'troubleshoot', 'investigate', 'diagnose',
-            'optimize', 'refactor', 'design', 'architect', 'plan', 'strategy',
-            'algorithm', 'logic', 'reasoning', 'problem-solving', 'complex',
-            'multi-step', 'multi step', 'complicated', 'sophisticated',
-            'performance', 'efficiency', 'scalability', 'maintainability',
-            'security', 'vulnerability', 'testing', 'validation', 'verification',
-            'integration', 'deployment', 'configuration', 'setup', 'environment',
-            'dependency', 'compatibility', 'migration', 'upgrade', 'downgrade',
-            'backup', 'restore', 'recovery', 'monitoring', 'logging',
-            'error handling', 'exception', 'edge case', 'corner case',
-            'data analysis', 'statistics', 'metrics', 'reporting',
-            'automation', 'scripting', 'workflow', 'pipeline',
-            # Query-specific complex keywords
-            'how to', 'what is the best way', 'why does', 'when should',
-            'which approach', 'compare', 'difference between', 'similarities',
-            'pros and cons', 'advantages', 'disadvantages', 'trade-offs',
-            'best practices', 'recommendations', 'suggestions', 'alternatives',
-            'considerations', 'implications', 'consequences', 'impact',
-            'evaluation', 'assessment', 'review', 'analysis of'
-        }
+        # Keywords that indicate complex reasoning / simple tasks
+        self.complex_keywords = _COMPLEX_KEYWORDS
+        self.simple_keywords = _SIMPLE_KEYWORDS
         
-        # Keywords that indicate simple tasks
-        self.simple_keywords = {
-            'list', 'show', 'display', 'print', 'echo', 'cat', 'ls', 'dir',
-            'count', 'find', 'search', 'grep', 'copy', 'cp', 'move', 'mv',
-            'delete', 'rm', 'remove', 'create', 'mkdir', 'touch', 'new',
-            'start', 'stop', 'restart', 'status', 'info', 'help',
-            'install', 'uninstall', 'update', 'upgrade', 'downgrade',
-            'check', 'verify', 'test', 'run', 'execute', 'launch'
-        }
-        
-        # Patterns that indicate complex reasoning
-        self.complex_patterns = [
-            r'\b(why|how|what if|suppose|imagine|consider)\b',
-            r'\b(if|when|unless|while|for|foreach)\b',
-            r'\b(and|or|but|however|nevertheless|therefore)\b',
-            r'\b(problem|issue|bug|error|failure|crash)\b',
-            r'\b(improve|enhance|better|faster|more efficient)\b',
-            r'\b(compare|contrast|difference|similarity)\b',
-            r'\b(before|after|during|while|until)\b',
-            r'\b(unless|otherwise|alternatively|instead)\b',
-            r'\b(complex|complicated|sophisticated|advanced)\b',
-            r'\b(multi.?step|multi.?stage|multi.?phase)\b',
-            r'\b(conditional|dependent|interdependent)\b',
-            r'\b(sequence|order|priority|dependency)\b',
-            r'\b(analysis|investigation|research|study)\b',
-            r'\b(design|architecture|structure|framework)\b',
-            r'\b(optimization|performance|efficiency|scalability)\b',
-            r'\b(security|vulnerability|threat|risk)\b',
-            r'\b(testing|validation|verification|quality)\b',
-            r'\b(integration|deployment|configuration|setup)\b',
-            r'\b(automation|scripting|workflow|pipeline)\b',
-            r'\b(monitoring|logging|alerting|tracking)\b',
-            # Query-specific complex patterns
-            r'\b(how to|what is the best way|why does|when should)\b',
-            r'\b(which approach|compare|difference between|similarities)\b',
-            r'\b(pros and cons|advantages|disadvantages|trade.?offs)\b',
-            r'\b(best practices|recommendations|suggestions|alternatives)\b',
-            r'\b(considerations|implications|consequences|impact)\b',
-            r'\b(evaluation|assessment|review|analysis of)\b',
-            r'\b(what would happen if|suppose that|imagine if)\b',
-            r'\b(under what circumstances|in what situations)\b',
-            r'\b(how would you|what would you recommend)\b',
-            r'\b(explain why|describe how|analyze the)\b'
-        ]
-        
-        # Patterns that indicate simple tasks
-        self.simple_patterns = [
-            r'\b(list|show|display|print|echo)\b',
-            r'\b(count|find|search|grep)\b',
-            r'\b(copy|move|delete|remove|create)\b',
-            r'\b(start|stop|restart|status|info)\b',
-            r'\b(install|uninstall|update|upgrade)\b',
-            r'\b(check|verify|test|run|execute)\b',
-            r'^\s*[a-z]+\s+[a-z0-9_.-]+\s*$',  # Simple command pattern
-            r'^\s*[a-z]+\s+[a-z0-9_.-]+\s+[a-z0-9_.-]+\s*$',  # Command with 2 args
-        ]
+        # Patterns that indicate complex reasoning / simple tasks
+        self.complex_patterns = _COMPLEX_PATTERNS
+        self.simple_patterns = _SIMPLE_PATTERNS
     
     def _debug_print(self, message: str):
         """Print debug message if debug mode is enabled."""
         if self.debug:
             print(f"complexity_analyzer | {message}")
     
-    def analyze_complexity(self, task: str) -> Dict[str, any]:
-        """Analyze the complexity of a task.
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def _score(task_lower: str) -> Tuple[int, Tuple[str, ...], Tuple[str, ...]]:
+        """Compute the keyword and pattern complexity score of a lowercased task.
+        
+        The score depends only on the task and the module-level tables, so results are
+        cached; retried and repeated prompts skip the keyword and pattern scans.
         
-        Args:
-            task: The task string to analyze
-            
         Returns:
-            Dictionary with complexity analysis results
+            Tuple of (complexity score, complex keywords found, simple keywords found)
         """
-        task_lower = task.lower().strip()
-        
-        # Initialize scores
         complexity_score = 0
-        reasoning_score = 0
-        step_count_estimate = 1
         
-        # Check for complex keywords
-        complex_keyword_count = sum(1 for keyword in self.complex_keywords if keyword in task_lower)
-        complexity_score += complex_keyword_count * 2
+        # Check for complex keywords (the found list also feeds the result)
+        complex_keywords_found = tuple(keyword for keyword in _COMPLEX_KEYWORDS if keyword in task_lower)
+        complexity_score += len(complex_keywords_found) * 2
         
         # Check for simple keywords
-        simple_keyword_count = sum(1 for keyword in self.simple_keywords if keyword in task_lower)
-        complexity_score -= simple_keyword_count * 1
+        simple_keywords_found = tuple(keyword for keyword in _SIMPLE_KEYWORDS if keyword in task_lower)
+        complexity_score -= len(simple_keywords_found) * 1
         
         # Check for complex patterns
-        complex_pattern_count = sum(1 for pattern in self.complex_patterns if re.search(pattern, task_lower))
+        complex_pattern_count = _count_matching_patterns(_COMPLEX_UNION_RE, _COMPLEX_REGEXES, task_lower)
         complexity_score += complex_pattern_count * 3
         
         # Check for simple patterns
-        simple_pattern_count = sum(1 for pattern in self.simple_patterns if re.search(pattern, task_lower))
+        simple_pattern_count = _count_matching_patterns(_SIMPLE_UNION_RE, _SIMPLE_REGEXES, task_lower)
         complexity_score -= simple_pattern_count * 2
         
-        # Analyze reasoning requirements
-        reasoning_indicators = [
-            'why', 'how', 'what if', 'suppose', 'imagine', 'consider',
-            'problem', 'issue', 'bug', 'error', 'failure', 'crash',
-            'improve', 'enhance', 'better', 'faster', 'more efficient',
-            'compare', 'contrast', 'difference', 'similarity',
-            'unless', 'otherwise', 'alternatively', 'instead'
-        ]
+        return complexity_score, complex_keywords_found, simple_keywords_found
+    
+    def _requires_complex_reasoning(self, task: str) -> bool:
+        """Apply the analyze_complexity decision rules, cheapest first, stopping at the first that fires."""
+        task_lower = task.lower().strip()
+        if len(task.split()) > 15 or any(word in task_lower for word in _FORCE_COMPLEX_WORDS):
+            return True
+        if len(set(_REASONING_RE.findall(task_lower))) > 3:
+            return True
+        # A step estimate above 2 needs a score above 10, so the score rule covers it
+        return self._score(task_lower)[0] > 8
+    
+    def analyze_complexity(self, task: str) -> Dict[str, any]:
+        """Analyze the complexity of a task.
+        
+        Args:
+            task: The task string to analyze
+            
+        Returns:
+            Dictionary with complexity analysis results
+        """
+        task_lower = task.lower().strip()
+        word_count = len(task.split())
+        
+        complexity_score, complex_keywords_found, simple_keywords_found = self._score(task_lower)
         
-        reasoning_score = sum(1 for indicator in reasoning_indicators if indicator in task_lower)
+        # Analyze reasoning requirements (each distinct indicator counts once)
+        reasoning_indicators = list(dict.fromkeys(_REASONING_RE.findall(task_lower)))
+        reasoning_score = len(reasoning_indicators)
         
         # Estimate step count based on complexity
         if complexity_score > 10:
@@ -154,8 +213,8 @@ class TaskComplexityAnalyzer:
             complexity_score > 8 or 
             reasoning_score > 3 or 
             step_count_estimate > 2 or
-            len(task.split()) > 15 or
-            any(word in task_lower for word in ['debug', 'troubleshoot', 'investigate', 'analyze'])
+            word_count > 15 or
+            any(word in task_lower for word in _FORCE_COMPLEX_WORDS)
         )
         
         # Determine recommended model
@@ -167,10 +226,10 @@ class TaskComplexityAnalyzer:
             'step_count_estimate': step_count_estimate,
             'requires_complex_reasoning': requires_complex_reasoning,
             'recommended_model': recommended_model,
-            'complex_keywords_found': [k for k in self.complex_keywords if k in task_lower],
-            'simple_keywords_found': [k for k in self.simple_keywords if k in task_lower],
-            'word_count': len(task.split()),
-            'reasoning_indicators': [i for i in reasoning_indicators if i in task_lower]
+            'complex_keywords_found': list(complex_keywords_found),
+            'simple_keywords_found': list(simple_keywords_found),
+            'word_count': word_count,
+            'reasoning_indicators': reasoning_indicators
         }
         
 
@@ -186,8 +245,7 @@ class TaskComplexityAnalyzer:
         Returns:
             True if GPT-4o should be used, False otherwise
         """
-        analysis = self.analyze_complexity(task)
-        return analysis['requires_complex_reasoning']
+        return self._requires_complex_reasoning(task)
     
     def get_recommended_model(self, task: str) -> str:
         """Get the recommended LLM model for a task.
@@ -198,5 +256,4 @@ class TaskComplexityAnalyzer:
         Returns:
             Recommended model name
         """
-        analysis = self.analyze_complexity(task)
-        return analysis['recommended_model']
+        return "gpt-4o" if self._requires_complex_reasoning(task) else "gpt-3.5-turbo"
@@ -1,9 +1,15 @@
-from typing import Dict, Any, List, TypedDict
+from typing import Dict, Any, List, Optional, Tuple, TypedDict
+import json
 import os
+import re
+from datetime import datetime
+from pathlib import Path
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from termagent.agents.base_agent import BaseAgent
 from termagent.agents.router_agent import RouterAgent
+from termagent.shell_commands import get_handler
 
 
 
@@ -39,10 +45,6 @@ def _debug_print(message: str, debug: bool = False):
 def save_successful_task_breakdowns(breakdowns: List[Dict[str, Any]], file_path: str = None) -> bool:
     """Save successful task breakdowns to a JSON file for persistence."""
     try:
-        import json
-        import os
-        from pathlib import Path
-        
         if file_path is None:
             # Default to ~/.termagent/task_breakdowns.json
             history_dir = Path.home() / ".termagent"
@@ -64,9 +66,6 @@ def save_successful_task_breakdowns(breakdowns: List[Dict[str, Any]], file_path:
 def load_successful_task_breakdowns(file_path: str = None) -> List[Dict[str, Any]]:
     """Load successful task breakdowns from a JSON file."""
     try:
-        import json
-        from pathlib import Path
-        
         if file_path is None:
             # Default to ~/.termagent/task_breakdowns.json
             history_dir = Path.home() / ".termagent"
@@ -196,12 +195,8 @@ def handle_direct_execution(state: AgentState) -> AgentState:
     messages = state.get("messages", [])
     last_command = state.get("last_command", "Unknown command")
     
-    # Import the shell command detector from its own module
-    import os
-    from termagent.shell_commands import ShellCommandHandler
-    
-    # Create detector instance
-    detector = ShellCommandHandler(debug=state.get("debug", False), no_confirm=state.get("no_confirm", False))
+    # Reuse the shared detector instance
+    detector = get_handler(debug=state.get("debug", False), no_confirm=state.get("no_confirm", False))
     
     # Shell commands execute directly without confirmation
     
@@ -272,9 +267,8 @@ def handle_task_breakdown(state: AgentState) -> AgentState:
                 messages.append(AIMessage(content=retry_message))
             
             try:
-                # Import and create ShellCommandDetector
-                from termagent.shell_commands import ShellCommandHandler
-                detector = ShellCommandHandler(
+                # Reuse the shared ShellCommandHandler
+                detector = get_handler(
                     debug=state.get("debug", False), 
                     no_confirm=state.get("no_confirm", False)
                 )
@@ -299,7 +293,7 @@ def handle_task_breakdown(state: AgentState) -> AgentState:
                 
                 _debug_print(f"🔍 Step {step_num} - Executing command: {command}", state.get("debug", False))
                 
-                # Execute command using ShellCommandDetector
+                # Execute command using ShellCommandHandler
                 current_cwd = state.get("current_working_directory", os.getcwd())
                 success, output, return_code, new_cwd = detector.execute_command(command, current_cwd)
                 
@@ -632,22 +626,19 @@ def handle_task_breakdown(state: AgentState) -> AgentState:
     success_count = len([r for r in results if "✅" in r])
     failure_count = len(failed_steps)
     
+    # Collect the summary in parts and join once; the per-step lines grow with the breakdown
     if failure_count == 0:
-        completion_message = ""
-        for result in results:
-            completion_message += f"  {result}\n"
+        completion_parts = [f"  {result}\n" for result in results]
     else:
-        completion_message = f"⚠️ Task completed with {success_count} successful and {failure_count} failed steps.\n\n"
-        completion_message += ""
-        for result in results:
-            completion_message += f"  {result}\n"
+        completion_parts = [f"⚠️ Task completed with {success_count} successful and {failure_count} failed steps.\n\n"]
+        completion_parts.extend(f"  {result}\n" for result in results)
         
         # Provide detailed failure analysis and suggestions
-        completion_message += f"\n🔍 Failed Steps Analysis:\n"
+        completion_parts.append("\n🔍 Failed Steps Analysis:\n")
         for failed_step in failed_steps:
-            completion_message += f"  Step {failed_step['step']}: {failed_step['description']}\n"
-            completion_message += f"    Attempts: {failed_step['attempts']}\n"
-            completion_message += f"    Final Error: {failed_step['final_error']}\n"
+            completion_parts.append(f"  Step {failed_step['step']}: {failed_step['description']}\n")
+            completion_parts.append(f"    Attempts: {failed_step['attempts']}\n")
+            completion_parts.append(f"    Final Error: {failed_step['final_error']}\n")
         
         # Ask LLM for overall recovery suggestions
         recovery_suggestions = _get_llm_recovery_suggestions(
@@ -655,16 +646,17 @@ def handle_task_breakdown(state: AgentState) -> AgentState:
         )
         
         if recovery_suggestions:
-            completion_message += f"\n🧠 LLM Recovery Suggestions:\n{recovery_suggestions}\n"
+            completion_parts.append(f"\n🧠 LLM Recovery Suggestions:\n{recovery_suggestions}\n")
         
         # Provide helpful suggestions for failed steps
-        completion_message += "\n💡 Manual Recovery Suggestions:\n"
+        completion_parts.append("\n💡 Manual Recovery Suggestions:\n")
         if any("docker" in r.lower() for r in results if "❌" in r):
-            completion_message += "• For Docker errors, check if the container name exists: `docker ps -a`\n"
-            completion_message += "• Verify container is running: `docker ps`\n"
+            completion_parts.append("• For Docker errors, check if the container name exists: `docker ps -a`\n")
+            completion_parts.append("• Verify container is running: `docker ps`\n")
         if any("git" in r.lower() for r in results if "❌" in r):
-            completion_message += "• For Git errors, check repository status: `git status`\n"
-            completion_message += "• Verify you're in a git repository: `git rev-parse --git-dir`\n"
+            completion_parts.append("• For Git errors, check repository status: `git status`\n")
+            completion_parts.append("• Verify you're in a git repository: `git rev-parse --git-dir`\n")
+    completion_message = "".join(completion_parts)
     
     messages.append(AIMessage(content=completion_message))
     
@@ -685,14 +677,14 @@ def handle_task_breakdown(state: AgentState) -> AgentState:
         if existing_breakdown:
             # Update the existing breakdown with the new timestamp
             existing_breakdown["task_breakdown"] = task_breakdown
-            existing_breakdown["timestamp"] = __import__("datetime").datetime.now().isoformat()
+            existing_breakdown["timestamp"] = datetime.now().isoformat()
             existing_breakdown["working_directory"] = state.get("current_working_directory", "unknown")
         else:
             # Add new breakdown
             successful_breakdown = {
                 "command": original_command,
                 "task_breakdown": task_breakdown,
-                "timestamp": __import__("datetime").datetime.now().isoformat(),
+                "timestamp": datetime.now().isoformat(),
                 "working_directory": state.get("current_working_directory", "unknown")
             }
             successful_task_breakdowns.append(successful_breakdown)
@@ -714,7 +706,6 @@ def handle_task_breakdown(state: AgentState) -> AgentState:
 def process_command(command: str, graph, debug: bool = False, no_confirm: bool = False) -> Dict[str, Any]:
     """Process a command through the agent graph."""
     # Create initial state
-    import os
     # Load existing successful task breakdowns
     existing_breakdowns = load_successful_task_breakdowns()
     
@@ -768,13 +759,33 @@ def process_command_with_cwd(command: str, graph, current_working_directory: str
     return result
 
 
+# GPT-4o agents for the recovery helpers, keyed by (name, debug); only successful set-ups are kept
+_GPT4O_AGENTS: Dict[Tuple[str, bool], BaseAgent] = {}
+
+
+def _get_gpt4o_agent(name: str, debug: bool) -> Optional[BaseAgent]:
+    """Return a shared GPT-4o BaseAgent for a recovery helper, or None if no LLM is available.
+
+    Building the agent constructs a new OpenAI client; reusing it keeps the connection
+    pool warm across the steps of a task instead of paying that setup on every call.
+    A failed set-up is not cached, so a later call can succeed once the LLM is reachable.
+    """
+    key = (name, debug)
+    base_agent = _GPT4O_AGENTS.get(key)
+    if base_agent is None:
+        base_agent = BaseAgent(name, debug=debug)
+        if not base_agent._initialize_llm("gpt-4o"):
+            return None
+        _GPT4O_AGENTS[key] = base_agent
+    return base_agent
+
+
 def _get_llm_alternative_for_failed_step(step_num: int, description: str, command: str, error_output: str, debug: bool = False) -> str:
     """Ask LLM for an alternative approach when a step fails."""
     try:
-        from termagent.agents.base_agent import BaseAgent
-        base_agent = BaseAgent("failure_recovery", debug=debug)
+        base_agent = _get_gpt4o_agent("failure_recovery", bool(debug))
         
-        if base_agent._initialize_llm("gpt-4o"):
+        if base_agent is not None:
             _debug_print("failure_recovery | 🧠 Using GPT-4o for step failure recovery", debug)
             
             system_prompt = """You are an expert at troubleshooting failed shell commands and suggesting alternatives. Given a failed step, provide a better approach.
@@ -838,10 +849,9 @@ Suggest an alternative command or approach:"""
 def _get_llm_error_alternative(step_num: int, description: str, command: str, error: str, debug: bool = False) -> str:
     """Ask LLM for an alternative approach when a step encounters an execution error."""
     try:
-        from termagent.agents.base_agent import BaseAgent
-        base_agent = BaseAgent("error_recovery", debug=debug)
+        base_agent = _get_gpt4o_agent("error_recovery", bool(debug))
         
-        if base_agent._initialize_llm("gpt-4o"):
+        if base_agent is not None:
             _debug_print("error_recovery | 🧠 Using GPT-4o for execution error recovery", debug)
             
             system_prompt = """You are an expert at handling command execution errors and suggesting alternatives. Given a failed step, provide a better approach.
@@ -901,10 +911,9 @@ Suggest an alternative command:"""
 def _get_llm_recovery_suggestions(failed_steps: list, task_breakdown: list, debug: bool = False) -> str:
     """Ask LLM for overall recovery suggestions when multiple steps fail."""
     try:
-        from termagent.agents.base_agent import BaseAgent
-        base_agent = BaseAgent("recovery_advisor", debug=debug)
+        base_agent = _get_gpt4o_agent("recovery_advisor", bool(debug))
         
-        if base_agent._initialize_llm("gpt-4o"):
+        if base_agent is not None:
             _debug_print("recovery_advisor | 🧠 Using GPT-4o for overall recovery suggestions", debug)
             
             system_prompt = """You are an expert at analyzing failed task breakdowns and providing recovery strategies. Given a list of failed steps, suggest overall recovery approaches.
@@ -964,10 +973,9 @@ Provide overall recovery suggestions and alternative approaches:"""
 def _reflect_on_step_execution(step_num: int, description: str, command: str, output: str, success: bool, debug: bool = False) -> Dict[str, Any]:
     """Use LLM to reflect on the output of a shell execution and decide whether to proceed."""
     try:
-        from termagent.agents.base_agent import BaseAgent
-        base_agent = BaseAgent("step_reflection", debug=debug)
+        base_agent = _get_gpt4o_agent("step_reflection", bool(debug))
         
-        if base_agent._initialize_llm("gpt-4o"):
+        if base_agent is not None:
             _debug_print(f"step_reflection | 🧠 Using GPT-4o for step {step_num} reflection", debug)
             
             system_prompt = """You are an expert at analyzing shell command execution results and deciding whether to proceed with the next step.
@@ -1015,9 +1023,6 @@ IMPORTANT: If the step failed (Success: False), you MUST suggest alternative com
             reflection_content = response.content.strip()
             
             # Try to extract JSON from the response
-            import json
-            import re
-            
             # Look for JSON content between ```json and ``` markers
             json_match = re.search(r'```json\s*(.*?)\s*```', reflection_content, re.DOTALL)
             if json_match:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for direct shell command handling in TermAgent.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from termagent.shell_commands import ShellCommandHandler, _ALIAS_RE
+
+
+def _handler(aliases=None) -> ShellCommandHandler:
+    """Create a handler with a fixed alias table instead of the user's shell aliases."""
+    handler = ShellCommandHandler()
+    handler._aliases_cache.update(aliases or {})
+    handler._aliases_loaded = True
+    return handler
+
+
+def test_ll_runs_as_ls_la():
+    """'ll' without an alias lists all entries in long format, keeping its arguments."""
+    with tempfile.TemporaryDirectory() as tmp:
+        open(os.path.join(tmp, "a.txt"), "w").close()
+        success, output, returncode, _ = _handler().execute_command("ll", tmp)
+        assert success and returncode == 0
+        assert "a.txt" in output and ".." in output.split()
+        success, output, _, _ = _handler().execute_command("ll a.txt", tmp)
+        assert success and output.startswith("-") and output.endswith("a.txt")
+
+
+def test_ll_alias_takes_precedence():
+    """A shell alias for 'll' is used instead of the built-in expansion."""
+    with tempfile.TemporaryDirectory() as tmp:
+        open(os.path.join(tmp, "a.txt"), "w").close()
+        success, output, _, _ = _handler({"ll": "ls -1"}).execute_command("ll", tmp)
+        assert success and output == "a.txt"
+
+
+def test_pwd_answers_from_tracked_cwd():
+    """A bare 'pwd' returns the absolute tracked cwd; 'pwd' with options still runs."""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.mkdir(os.path.join(tmp, "sub"))
+        cwd = os.path.join(tmp, "sub", "..")
+        assert _handler().execute_command("pwd", cwd) == (True, os.path.abspath(cwd), 0, cwd)
+        success, output, returncode, _ = _handler().execute_command("pwd -P", tmp)
+        assert success and returncode == 0 and output == os.path.realpath(tmp)
+
+
+def test_dollar_expansion_runs_in_shell():
+    """Variables and command substitutions are expanded, not passed through literally."""
+    handler = _handler()
+    assert handler.execute_command("echo $HOME", "/")[1] == os.environ["HOME"]
+    assert handler.execute_command("echo $(echo nested)", "/")[1] == "nested"
+
+
+def test_ampersand_runs_in_shell():
+    """'&' backgrounds a command and '&&' chains commands instead of becoming arguments."""
+    handler = _handler()
+    assert handler.execute_command("true & echo done", "/")[1] == "done"
+    assert handler.execute_command("echo a && echo b", "/")[1] == "a\nb"
+
+
+def test_direct_exec_keeps_program_name():
+    """Programs exec'd without a shell see argv[0] as typed, not the resolved PATH entry."""
+    with tempfile.TemporaryDirectory() as tmp:
+        success, message, returncode, _ = _handler().execute_command("ls missing-file", tmp)
+        assert not success and returncode != 0
+        assert message.startswith("❌ Command failed: ls: "), message
+        success, message, returncode, _ = _handler().execute_command("no-such-program-xyz", tmp)
+        assert not success and returncode is None and "Command not found" in message
+
+def test_cd_needs_only_search_permission():
+    """cd enters a directory that can be searched but not listed."""
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "locked")
+        os.mkdir(target)
+        os.chmod(target, 0o311)
+        try:
+            success, _, returncode, new_cwd = _handler().execute_command("cd locked", tmp)
+        finally:
+            os.chmod(target, 0o755)
+        assert success and returncode == 0 and new_cwd == target
+
+
+def test_cd_reports_unusable_targets():
+    """cd keeps the cwd and explains why when the target is missing, a file or unreachable."""
+    with tempfile.TemporaryDirectory() as tmp:
+        open(os.path.join(tmp, "file"), "w").close()
+        success, message, _, new_cwd = _handler().execute_command("cd missing", tmp)
+        assert not success and new_cwd == tmp and "does not exist" in message
+        success, message, _, new_cwd = _handler().execute_command("cd file", tmp)
+        assert not success and new_cwd == tmp and "Not a directory" in message
+        # Other stat failures are not reported as a missing directory
+        os.symlink("loop", os.path.join(tmp, "loop"))
+        success, message, _, new_cwd = _handler().execute_command("cd loop", tmp)
+        assert not success and new_cwd == tmp and "Cannot access directory" in message
+
+
+def test_unbalanced_quotes_are_reported_not_raised():
+    """An unclosed quote is a failed command result on every path, not a ValueError."""
+    handler = _handler()
+    for command in ('cd "foo', 'source "x', 'ls "foo', "less 'x"):
+        success, message, _, new_cwd = handler.execute_command(command, "/")
+        assert not success and new_cwd == "/", command
+        assert "No closing quotation" in message, (command, message)
+
+def test_venv_directory_is_parent_of_bin():
+    """Sourcing <venv>/bin/activate reports the venv root and its pyvenv.cfg version."""
+    with tempfile.TemporaryDirectory() as tmp:
+        venv_dir = os.path.join(tmp, "project-venv")
+        os.makedirs(os.path.join(venv_dir, "bin"))
+        with open(os.path.join(venv_dir, "pyvenv.cfg"), "w") as f:
+            f.write("home = /usr/bin\nversion = 3.11.7\n")
+        with open(os.path.join(venv_dir, "bin", "activate"), "w") as f:
+            f.write(f'VIRTUAL_ENV="{venv_dir}"\nexport VIRTUAL_ENV\n')
+        success, message, _, _ = _handler().execute_command("source project-venv/bin/activate", tmp)
+        assert success
+        assert f"Python venv: Python 3.11.7 at {venv_dir}\n" in message
+
+
+def test_output_without_newlines_is_bounded():
+    """A single huge line is trimmed to a bounded tail instead of being kept whole."""
+    success, output, _, _ = _handler().execute_command("head -c 20000000 /dev/zero | tr '\\0' a", "/")
+    assert success
+    assert output.startswith("... (1 earlier lines truncated)\n")
+    assert len(output) <= 5 * 1024 * 1024 and output.endswith("a" * 1000)
+
+
+def test_alias_regex_parses_shell_and_rc_formats():
+    """bash and rc-file 'alias name=value' and zsh 'name=value' lines parse with quotes stripped."""
+    cases = {
+        "alias ll='ls -alF'": ("ll", "ls -alF"),
+        'alias gs="git status"': ("gs", "git status"),
+        "gco='git checkout'": ("gco", "git checkout"),
+        "alias k=kubectl": ("k", "kubectl"),
+        "alias mixed='a\"": ("mixed", "'a\""),
+    }
+    for line, (name, value) in cases.items():
+        match = _ALIAS_RE.match(line)
+        assert match and (match.group(1), match.group(3)) == (name, value), line
+    assert _ALIAS_RE.match("export PATH") is None
+
+
+def test_alias_sources_and_precedence():
+    """Shell aliases win over rc-file definitions; non-alias rc lines are ignored."""
+    handler = _handler()
+    handler._parse_alias_output("alias ll='ls -alF'\ngs='git status'\n")
+    handler._parse_config_file([
+        "# alias commented='out'\n",
+        "export EDITOR=vim\n",
+        "  alias ll='ls -l'\n",
+        "alias la=\"ls -A\"\n",
+    ])
+    assert handler.get_aliases() == {"ll": "ls -alF", "gs": "git status", "la": "ls -A"}
+    assert handler.resolve_alias("gs --short ") == "git status --short"
+    assert handler.resolve_alias("unknown") is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")